@@ -0,0 +1,117 @@
+"""
+Async TTL Cache
+
+In-process TTL + LRU cache for connector lookups. Concurrent misses for the
+same key are coalesced into a single upstream call.
+"""
+
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Hashable
+from typing import Any, Callable, Optional
+
+_MISSING = object()
+
+
+class AsyncTTLCache:
+    """Bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    Cached values are shared between callers and should be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` if missing/expired."""
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry if full.
+
+        ``ttl`` overrides the cache-wide TTL for this entry.
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, calling ``loader`` on a miss.
+
+        Only one ``loader`` call runs per key at a time; concurrent callers await
+        the same result. Exceptions are propagated and never cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key, loader))
+            # Mark the error retrieved even when every caller was cancelled before it finished
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = future
+        # Shield so a cancelled caller does not cancel the shared load
+        return await asyncio.shield(future)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+
+def _make_key(args: tuple, kwargs: dict[str, Any]) -> Hashable:
+    """Build a hashable cache key from call arguments (lists become tuples)."""
+
+    def freeze(value: Any) -> Any:
+        if isinstance(value, (list, tuple)):
+            return tuple(freeze(v) for v in value)
+        return value
+
+    return (freeze(args), tuple(sorted((k, freeze(v)) for k, v in kwargs.items())))
+
+
+def async_ttl_cache(ttl: float = 600, maxsize: int = 1024):
+    """Decorate an async function with an :class:`AsyncTTLCache`."""
+
+    def decorator(func):
+        cache = AsyncTTLCache(maxsize=maxsize, ttl=ttl)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            try:
+                hash(key)
+            except TypeError:
+                return await func(*args, **kwargs)
+            return await cache.get_or_load(key, lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
@@ -0,0 +1,247 @@
+"""
+Client-side Rate Limiting
+
+Proactive throttling for upstream APIs so requests stay under the provider
+quota instead of running into 429 responses.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Mapping
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+from connectors import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on a single shared-window round trip, including waiting for a
+# pooled Redis connection; past it the limiter fails open
+_SHARED_TIMEOUT = 0.5
+# After a failed shared-window call, skip Redis for this many seconds so an
+# unhealthy Redis is not retried on every request
+_SHARED_COOLDOWN = 5.0
+# X-RateLimit-Reset values above this are epoch timestamps rather than delays in seconds
+_EPOCH_RESET_MIN = 1_000_000_000
+
+# Count a request in a fixed window and start the window's expiry atomically
+_WINDOW_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a header value in seconds, returning None if absent or invalid."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class SlidingWindowLimiter:
+    """Allow at most ``rpm`` requests in any sliding ``window`` of seconds.
+
+    Waiters are served in order. The limiter can also be paused, e.g. when the
+    upstream signals through response headers that the quota is nearly spent.
+
+    When Redis is configured, requests are additionally counted in a fixed
+    window shared by all worker processes, so the quota holds across workers.
+    """
+
+    def __init__(self, rpm: int, window: float = 60.0, name: str = "upstream"):
+        self.rpm = rpm
+        self.window = window
+        self.name = name
+        self._timestamps: deque[float] = deque()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._paused_until = 0.0
+        self._script: Optional[Any] = None
+        self._script_redis: Optional[Any] = None
+        self._shared_skip_until = 0.0
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent and record it."""
+        async with self._get_lock():
+            await self._acquire_local()
+        # Outside the lock: a slow Redis must not serialize every request in the process
+        await self._acquire_shared()
+
+    def _get_lock(self) -> asyncio.Lock:
+        """Return the lock for the running loop.
+
+        Created lazily: on Python 3.9 asyncio primitives bind to the loop
+        current at construction, which for module-level limiters is not the
+        server's loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def _acquire_local(self) -> None:
+        """Wait for a slot in this process's sliding window."""
+        while True:
+            now = time.monotonic()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            cutoff = now - self.window
+            while self._timestamps and self._timestamps[0] <= cutoff:
+                self._timestamps.popleft()
+
+            if len(self._timestamps) < self.rpm:
+                self._timestamps.append(now)
+                return
+
+            await asyncio.sleep(self._timestamps[0] + self.window - now)
+
+    async def _acquire_shared(self) -> None:
+        """Wait for a slot in the Redis window shared between processes.
+
+        Fails open: if Redis is unavailable only the local limit applies, and
+        Redis is skipped for ``_SHARED_COOLDOWN`` seconds after a failure.
+        """
+        redis = redis_client.get_redis()
+        if redis is None or time.monotonic() < self._shared_skip_until:
+            return
+        if self._script_redis is not redis:
+            # register_script uses EVALSHA and reloads the script if Redis lost it
+            self._script = redis.register_script(_WINDOW_SCRIPT)
+            self._script_redis = redis
+
+        while True:
+            now = time.time()
+            key = f"ratelimit:{self.name}:{int(now // self.window)}"
+            try:
+                count = await asyncio.wait_for(
+                    self._script(keys=[key], args=[int(self.window) + 1]), _SHARED_TIMEOUT
+                )
+            except Exception as e:
+                logger.warning(f"{self.name} shared rate limit unavailable: {e!r}")
+                self._shared_skip_until = time.monotonic() + _SHARED_COOLDOWN
+                return
+            if count <= self.rpm:
+                return
+            await asyncio.sleep(self.window - now % self.window)
+
+    def pause_until(self, deadline: float) -> None:
+        """Hold all requests until the monotonic time ``deadline``."""
+        self._paused_until = max(self._paused_until, deadline)
+
+    def update_from_headers(self, headers: Mapping[str, str], threshold: float = 0.1) -> None:
+        """Pause reactively based on ``Retry-After`` / ``X-RateLimit-*`` headers.
+
+        ``Retry-After`` always pauses. ``X-RateLimit-Reset`` (seconds until the
+        quota resets, or the epoch time it resets at) is honoured once fewer than
+        ``threshold`` of the ``X-RateLimit-Limit`` requests remain, for at most
+        one window.
+        """
+        retry_after = _parse_seconds(headers.get("Retry-After"))
+        if retry_after is not None:
+            logger.warning(f"{self.name} rate limit: pausing {retry_after}s (Retry-After)")
+            self.pause_until(time.monotonic() + retry_after)
+            return
+
+        remaining = _parse_seconds(headers.get("X-RateLimit-Remaining"))
+        limit = _parse_seconds(headers.get("X-RateLimit-Limit"))
+        reset = _parse_seconds(headers.get("X-RateLimit-Reset"))
+        if remaining is None or not limit or reset is None:
+            return
+        if remaining < limit * threshold:
+            if reset > _EPOCH_RESET_MIN:
+                reset -= time.time()
+            reset = min(max(reset, 0.0), self.window)
+            logger.warning(f"{self.name} rate limit: {remaining:.0f} left, pausing {reset}s")
+            self.pause_until(time.monotonic() + reset)
+
+
+class AIMDController:
+    """Adaptive concurrency limit using additive increase / multiplicative decrease.
+
+    The limit grows by roughly ``alpha`` per round of requests while the mean
+    latency over the last ``window`` requests stays under ``target_latency``,
+    and is multiplied by ``beta`` whenever a request fails with one of
+    ``error_types`` (rate limiting, timeouts).
+    """
+
+    def __init__(
+        self,
+        error_types: tuple[type[BaseException], ...],
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        target_latency: float = 0.5,
+        alpha: float = 0.5,
+        beta: float = 0.5,
+        window: int = 20,
+        name: str = "upstream",
+    ):
+        self.error_types = error_types
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.alpha = alpha
+        self.beta = beta
+        self.name = name
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._condition: Optional[asyncio.Condition] = None
+        self._condition_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def limit(self) -> int:
+        """Current number of concurrent requests allowed."""
+        return int(self._limit)
+
+    def on_success(self, latency: float) -> None:
+        """Record a successful request and grow the limit while latency is healthy."""
+        self._latencies.append(latency)
+        if sum(self._latencies) / len(self._latencies) <= self.target_latency:
+            self._limit = min(self.max_limit, self._limit + self.alpha / self._limit)
+
+    def on_error(self) -> None:
+        """Back off multiplicatively after an overload signal."""
+        self._limit = max(self.min_limit, self._limit * self.beta)
+        self._latencies.clear()
+        logger.warning(f"{self.name} concurrency limit reduced to {self.limit}")
+
+    def _get_condition(self) -> asyncio.Condition:
+        """Return the condition for the running loop (created lazily, see SlidingWindowLimiter)."""
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._condition_loop is not loop:
+            self._condition = asyncio.Condition()
+            self._condition_loop = loop
+        return self._condition
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of a request."""
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        except self.error_types:
+            self.on_error()
+            raise
+        else:
+            self.on_success(time.monotonic() - start)
+        finally:
+            async with condition:
+                self._in_flight -= 1
+                condition.notify_all()
@@ -0,0 +1,21 @@
+"""
+Timestamps
+
+UTC timestamps for responses and audit data, shared by the API server and the
+orchestrator.
+"""
+
+import time
+from datetime import datetime, timezone
+
+# Cached (epoch second, ISO timestamp) pair; second resolution is enough for responses
+_ts_cache: list = [0, ""]
+
+
+def now_iso() -> str:
+    """Return the current UTC time as an ISO 8601 string, formatted once per second."""
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[1] = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        _ts_cache[0] = now
+    return _ts_cache[1]
@@ -10,6 +10,16 @@ import os
 from typing import Any, Optional
 
 import httpx
+import orjson
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from connectors._cache import async_ttl_cache
+from connectors._ratelimit import AIMDController, SlidingWindowLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +27,13 @@ logger = logging.getLogger(__name__)
 KVK_API_KEY = os.getenv("KVK_API_KEY", "l7xx1f2691f2520d487b902f4e0b57a0b197")
 KVK_BASE_URL = os.getenv("KVK_BASE_URL", "https://api.kvk.nl/test/api")
 KVK_TIMEOUT = int(os.getenv("KVK_TIMEOUT", "30"))
+KVK_CONNECT_TIMEOUT = float(os.getenv("KVK_CONNECT_TIMEOUT", "5"))
+KVK_RATE_LIMIT_RPM = int(os.getenv("KVK_RATE_LIMIT_RPM", "600"))
+KVK_MAX_ATTEMPTS = int(os.getenv("KVK_MAX_ATTEMPTS", "4"))
+
+# Cache TTLs (seconds); profile data changes on the order of days
+KVK_CACHE_TTL_SEARCH = int(os.getenv("KVK_CACHE_TTL_SEARCH", "300"))
+KVK_CACHE_TTL_PROFILE = int(os.getenv("KVK_CACHE_TTL_PROFILE", "3600"))
 
 # API Endpoints
 SEARCH_ENDPOINT = f"{KVK_BASE_URL}/v2/zoeken"
@@ -48,45 +65,113 @@ class KVKRateLimitError(KVKError):
     pass
 
 
+# Client-side throttling shared by all requests to the KVK API
+_limiter = SlidingWindowLimiter(KVK_RATE_LIMIT_RPM, name="KVK")
+
+# Adaptive cap on concurrent requests, backing off on rate limiting and timeouts
+_concurrency = AIMDController(error_types=(KVKRateLimitError, httpx.TimeoutException), name="KVK")
+
+
+def _retrying() -> AsyncRetrying:
+    """Retry policy for transient failures: exponential backoff with full jitter.
+
+    Retry-After is honoured by the rate limiter, which delays the next attempt.
+    """
+    return AsyncRetrying(
+        retry=retry_if_exception_type((KVKRateLimitError, httpx.TimeoutException)),
+        wait=wait_random_exponential(multiplier=0.5, max=8),
+        stop=stop_after_attempt(KVK_MAX_ATTEMPTS),
+        reraise=True,
+    )
+
+
+# Shared HTTP client, created lazily so connection pools are reused across requests
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared KVK HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            base_url=KVK_BASE_URL,
+            headers={"apikey": KVK_API_KEY, "Accept": "application/json"},
+            # Fail fast on unreachable hosts; slow responses get the full timeout
+            timeout=httpx.Timeout(KVK_TIMEOUT, connect=KVK_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared KVK HTTP client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def warmup() -> None:
+    """Open a connection to the KVK API ahead of the first real request.
+
+    Resolves DNS and completes the TLS handshake so the pooled connection is
+    ready. Any response status, or failure, is ignored.
+    """
+    try:
+        await _get_client().head("/v2/zoeken", timeout=5)
+    except httpx.HTTPError as e:
+        logger.warning(f"KVK API warmup failed: {e}")
+
+
 async def _make_request(
     url: str,
     params: Optional[dict[str, Any]] = None,
-    timeout: int = KVK_TIMEOUT,
+    timeout: Optional[float] = None,
 ) -> dict[str, Any]:
     """Make an authenticated request to the KVK API."""
-    headers = {"apikey": KVK_API_KEY, "Accept": "application/json"}
-
+    # Keep the client's split connect/read timeouts unless the caller overrides them
+    request_timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else timeout
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            logger.info(f"KVK API Request: {url} with params {params}")
-            response = await client.get(url, headers=headers, params=params)
-
-            # Handle specific status codes
-            if response.status_code == 404:
-                raise KVKNotFoundError(f"Resource not found: {url}")
-            elif response.status_code == 429:
-                raise KVKRateLimitError("KVK API rate limit exceeded")
-            elif response.status_code >= 400:
-                raise KVKAPIError(f"KVK API error: {response.status_code} - {response.text}")
-
-            response.raise_for_status()
-            data = response.json()
-            logger.info(f"KVK API Response: {response.status_code}")
-            return data
+        async for attempt in _retrying():
+            with attempt:
+                await _limiter.acquire()
+                async with _concurrency.slot():
+                    client = _get_client()
+                    logger.info("KVK API Request: %s with params %s", url, params)
+                    response = await client.get(url, params=params, timeout=request_timeout)
+                    _limiter.update_from_headers(response.headers)
+
+                    # Handle specific status codes
+                    if response.status_code == 404:
+                        raise KVKNotFoundError(f"Resource not found: {url}")
+                    elif response.status_code == 429:
+                        raise KVKRateLimitError("KVK API rate limit exceeded")
+                    elif response.status_code >= 400:
+                        # Only decode the start of the body; error pages can be large
+                        detail = response.content[:256].decode(errors="replace")
+                        raise KVKAPIError(f"KVK API error: {response.status_code} - {detail}")
+
+                    data = orjson.loads(response.content)
+                    logger.info(
+                        "KVK API Response: %s (%s)", response.status_code, response.http_version
+                    )
+                    return data
 
-    except KVKError:
-        raise
     except httpx.TimeoutException as e:
-        logger.error(f"KVK API timeout after {timeout}s")
-        raise KVKAPIError(f"Request timeout after {timeout}s") from e
+        logger.error(f"KVK API timeout after {timeout or KVK_TIMEOUT}s")
+        raise KVKAPIError(f"Request timeout after {timeout or KVK_TIMEOUT}s") from e
     except httpx.HTTPError as e:
         logger.error(f"KVK API HTTP error: {e}")
         raise KVKAPIError(f"HTTP error: {e}") from e
+    except KVKError:
+        raise
     except Exception as e:
         logger.error(f"KVK API unexpected error: {e}")
         raise KVKAPIError(f"Unexpected error: {e}") from e
 
 
+@async_ttl_cache(ttl=KVK_CACHE_TTL_SEARCH)
 async def search_company(
     query: str,
     company_type: Optional[str] = None,
@@ -104,39 +189,36 @@ async def search_company(
     if city:
         params["plaats"] = city
 
-    try:
-        data = await _make_request(SEARCH_ENDPOINT, params)
-        results = data.get("resultaten", [])
-        logger.info(f"Found {len(results)} results for query: {query}")
-        return results
-
-    except KVKError:
-        raise
-    except Exception as e:
-        logger.error(f"Error searching company: {e}")
-        return []
+    data = await _make_request(SEARCH_ENDPOINT, params)
+    results = data.get("resultaten", [])
+    logger.info("Found %d results for query: %s", len(results), query)
+    return results
 
 
+@async_ttl_cache(ttl=KVK_CACHE_TTL_PROFILE)
 async def get_basisprofiel(kvk_number: str) -> dict[str, Any]:
     """Get base profile (basisprofiel) for a company by KVK number."""
     url = f"{BASISPROFIEL_ENDPOINT}/{kvk_number}"
     data = await _make_request(url)
-    logger.info(f"Retrieved basisprofiel for KVK: {kvk_number}")
+    logger.info("Retrieved basisprofiel for KVK: %s", kvk_number)
     return data
 
 
+@async_ttl_cache(ttl=KVK_CACHE_TTL_PROFILE)
 async def get_eigenaar(kvk_number: str) -> dict[str, Any]:
     """Get owner (eigenaar) information for a company."""
     url = f"{BASISPROFIEL_ENDPOINT}/{kvk_number}/eigenaar"
     return await _make_request(url)
 
 
+@async_ttl_cache(ttl=KVK_CACHE_TTL_PROFILE)
 async def get_hoofdvestiging(kvk_number: str) -> dict[str, Any]:
     """Get main establishment (hoofdvestiging) for a company."""
     url = f"{BASISPROFIEL_ENDPOINT}/{kvk_number}/hoofdvestiging"
     return await _make_request(url)
 
 
+@async_ttl_cache(ttl=KVK_CACHE_TTL_PROFILE)
 async def get_vestigingen(kvk_number: str) -> list[dict[str, Any]]:
     """Get all establishments (vestigingen) for a company."""
     url = f"{BASISPROFIEL_ENDPOINT}/{kvk_number}/vestigingen"
@@ -152,40 +234,39 @@ async def get_vestigingsprofiel(vestiging_number: str) -> dict[str, Any]:
 
 def normalize_company_data(kvk_data: dict[str, Any]) -> dict[str, Any]:
     """Normalize KVK API response to internal company schema."""
+    get = kvk_data.get
+    hoofdvestiging = (get("_embedded") or {}).get("hoofdvestiging") or {}
+    addresses = hoofdvestiging.get("adressen")
+
     return {
-        "kvk_number": kvk_data.get("kvkNummer"),
-        "name": kvk_data.get("naam"),
-        "legal_form": kvk_data.get("rechtsvorm"),
-        "trade_names": kvk_data.get("handelsNamen", []),
+        "kvk_number": get("kvkNummer"),
+        "name": get("naam"),
+        "legal_form": get("rechtsvorm"),
+        "trade_names": get("handelsNamen", []),
         "sbi_codes": [
             {
                 "code": sbi.get("sbiCode"),
                 "description": sbi.get("sbiOmschrijving"),
                 "primary": sbi.get("indHoofdactiviteit", False),
             }
-            for sbi in kvk_data.get("sbiActiviteiten", [])
+            for sbi in get("sbiActiviteiten", ())
         ],
-        "establishment_address": _normalize_address(
-            kvk_data.get("_embedded", {}).get("hoofdvestiging", {}).get("adressen", [])
-        ),
-        "status": kvk_data.get("statutaireNaam"),
-        "foundation_date": kvk_data.get("datumAanvang"),
+        "establishment_address": _normalize_address(addresses[0]) if addresses else None,
+        "status": get("statutaireNaam"),
+        "foundation_date": get("datumAanvang"),
         "raw_data": kvk_data,
     }
 
 
-def _normalize_address(addresses: list[dict[str, Any]]) -> Optional[dict[str, Any]]:
-    """Normalize address data from KVK format."""
-    if not addresses:
-        return None
-
-    addr = addresses[0]
+def _normalize_address(addr: dict[str, Any]) -> dict[str, Any]:
+    """Normalize a single address from KVK format."""
+    get = addr.get
     return {
-        "street": addr.get("straatnaam"),
-        "house_number": addr.get("huisnummer"),
-        "postal_code": addr.get("postcode"),
-        "city": addr.get("plaats"),
-        "country": addr.get("land", "Nederland"),
+        "street": get("straatnaam"),
+        "house_number": get("huisnummer"),
+        "postal_code": get("postcode"),
+        "city": get("plaats"),
+        "country": get("land", "Nederland"),
     }
 
 
@@ -7,11 +7,25 @@ Screens entities against OFAC, EU, UN sanctions lists and PEP databases.
 API Documentation: https://www.opensanctions.org/docs/api/
 """
 
+import asyncio
+import hashlib
 import logging
 import os
+from collections.abc import Iterable
 from typing import Any, Optional
 
 import httpx
+import orjson
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from connectors import redis_client
+from connectors._cache import async_ttl_cache
+from connectors._ratelimit import AIMDController, SlidingWindowLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +33,15 @@ logger = logging.getLogger(__name__)
 OPENSANCTIONS_API_KEY = os.getenv("OPENSANCTIONS_API_KEY", "")
 OPENSANCTIONS_BASE_URL = os.getenv("OPENSANCTIONS_BASE_URL", "https://api.opensanctions.org")
 OPENSANCTIONS_TIMEOUT = int(os.getenv("OPENSANCTIONS_TIMEOUT", "30"))
+OPENSANCTIONS_CONNECT_TIMEOUT = float(os.getenv("OPENSANCTIONS_CONNECT_TIMEOUT", "5"))
+OPENSANCTIONS_RATE_LIMIT_RPM = int(os.getenv("OPENSANCTIONS_RATE_LIMIT_RPM", "300"))
+OPENSANCTIONS_MAX_ATTEMPTS = int(os.getenv("OPENSANCTIONS_MAX_ATTEMPTS", "4"))
+OPENSANCTIONS_SCREEN_CONCURRENCY = int(os.getenv("OPENSANCTIONS_SCREEN_CONCURRENCY", "10"))
+
+# Cache TTLs (seconds); sanctions lists are updated daily
+OPENSANCTIONS_CACHE_TTL_SEARCH = int(os.getenv("OPENSANCTIONS_CACHE_TTL_SEARCH", "300"))
+OPENSANCTIONS_CACHE_TTL_ENTITY = int(os.getenv("OPENSANCTIONS_CACHE_TTL_ENTITY", "86400"))
+OPENSANCTIONS_CACHE_TTL_REDIS = int(os.getenv("OPENSANCTIONS_CACHE_TTL_REDIS", "86400"))
 
 # Default datasets to search
 DEFAULT_DATASETS = [
@@ -27,6 +50,9 @@ DEFAULT_DATASETS = [
     "crime",  # Criminal watchlists
 ]
 
+# Topics that escalate the risk score of a match
+RISK_TOPICS = frozenset({"sanction", "crime", "poi"})
+
 
 class OpenSanctionsError(Exception):
     """Base exception for OpenSanctions API errors"""
@@ -52,48 +78,128 @@ class OpenSanctionsRateLimitError(OpenSanctionsError):
     pass
 
 
+# Client-side throttling shared by all requests to the OpenSanctions API
+_limiter = SlidingWindowLimiter(OPENSANCTIONS_RATE_LIMIT_RPM, name="OpenSanctions")
+
+# Adaptive cap on concurrent requests, backing off on rate limiting and timeouts
+_concurrency = AIMDController(
+    error_types=(OpenSanctionsRateLimitError, httpx.TimeoutException), name="OpenSanctions"
+)
+
+
+def _retrying() -> AsyncRetrying:
+    """Retry policy for transient failures: exponential backoff with full jitter.
+
+    Retry-After is honoured by the rate limiter, which delays the next attempt.
+    """
+    return AsyncRetrying(
+        retry=retry_if_exception_type((OpenSanctionsRateLimitError, httpx.TimeoutException)),
+        wait=wait_random_exponential(multiplier=0.5, max=8),
+        stop=stop_after_attempt(OPENSANCTIONS_MAX_ATTEMPTS),
+        reraise=True,
+    )
+
+
+# Shared HTTP client, created lazily so connection pools are reused across requests
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared OpenSanctions HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        headers = {"Accept": "application/json"}
+        if OPENSANCTIONS_API_KEY:
+            headers["Authorization"] = f"Bearer {OPENSANCTIONS_API_KEY}"
+
+        _client = httpx.AsyncClient(
+            http2=True,
+            base_url=OPENSANCTIONS_BASE_URL,
+            headers=headers,
+            # Fail fast on unreachable hosts; slow responses get the full timeout
+            timeout=httpx.Timeout(OPENSANCTIONS_TIMEOUT, connect=OPENSANCTIONS_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared OpenSanctions HTTP client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def warmup() -> None:
+    """Open a connection to the OpenSanctions API ahead of the first real request.
+
+    Resolves DNS and completes the TLS handshake so the pooled connection is
+    ready. Any response status, or failure, is ignored.
+    """
+    try:
+        await _get_client().head("/", timeout=5)
+    except httpx.HTTPError as e:
+        logger.warning(f"OpenSanctions API warmup failed: {e}")
+
+
 async def _make_request(
     endpoint: str,
     params: Optional[dict[str, Any]] = None,
-    timeout: int = OPENSANCTIONS_TIMEOUT,
+    timeout: Optional[float] = None,
+    method: str = "GET",
+    json: Optional[Any] = None,
 ) -> dict[str, Any]:
     """Make an authenticated request to the OpenSanctions API."""
+    # Keep the client's split connect/read timeouts unless the caller overrides them
+    request_timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else timeout
     url = f"{OPENSANCTIONS_BASE_URL}{endpoint}"
-    headers = {"Accept": "application/json"}
-
-    if OPENSANCTIONS_API_KEY:
-        headers["Authorization"] = f"Bearer {OPENSANCTIONS_API_KEY}"
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            logger.info(f"OpenSanctions API Request: {url} with params {params}")
-            response = await client.get(url, headers=headers, params=params)
-
-            if response.status_code == 404:
-                raise OpenSanctionsNotFoundError(f"Resource not found: {url}")
-            elif response.status_code == 429:
-                raise OpenSanctionsRateLimitError("Rate limit exceeded")
-            elif response.status_code >= 400:
-                raise OpenSanctionsAPIError(f"API error: {response.status_code} - {response.text}")
-
-            response.raise_for_status()
-            data = response.json()
-            logger.info(f"OpenSanctions API Response: {response.status_code}")
-            return data
+        async for attempt in _retrying():
+            with attempt:
+                await _limiter.acquire()
+                async with _concurrency.slot():
+                    client = _get_client()
+                    logger.info(
+                        "OpenSanctions API Request: %s %s with params %s", method, url, params
+                    )
+                    response = await client.request(
+                        method, url, params=params, json=json, timeout=request_timeout
+                    )
+                    _limiter.update_from_headers(response.headers)
+
+                    if response.status_code == 404:
+                        raise OpenSanctionsNotFoundError(f"Resource not found: {url}")
+                    elif response.status_code == 429:
+                        raise OpenSanctionsRateLimitError("Rate limit exceeded")
+                    elif response.status_code >= 400:
+                        # Only decode the start of the body; error pages can be large
+                        detail = response.content[:256].decode(errors="replace")
+                        raise OpenSanctionsAPIError(f"API error: {response.status_code} - {detail}")
+
+                    data = orjson.loads(response.content)
+                    logger.info(
+                        "OpenSanctions API Response: %s (%s)",
+                        response.status_code,
+                        response.http_version,
+                    )
+                    return data
 
-    except OpenSanctionsError:
-        raise
     except httpx.TimeoutException as e:
-        logger.error(f"Timeout after {timeout}s")
-        raise OpenSanctionsAPIError(f"Timeout after {timeout}s") from e
+        logger.error(f"Timeout after {timeout or OPENSANCTIONS_TIMEOUT}s")
+        raise OpenSanctionsAPIError(f"Timeout after {timeout or OPENSANCTIONS_TIMEOUT}s") from e
     except httpx.HTTPError as e:
         logger.error(f"HTTP error: {e}")
         raise OpenSanctionsAPIError(f"HTTP error: {e}") from e
+    except OpenSanctionsError:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         raise OpenSanctionsAPIError(f"Unexpected error: {e}") from e
 
 
+@async_ttl_cache(ttl=OPENSANCTIONS_CACHE_TTL_SEARCH)
 async def search_entity(
     query: str,
     schema: str = "Person",
@@ -101,7 +207,10 @@ async def search_entity(
     limit: int = 10,
     fuzzy: bool = True,
 ) -> list[dict[str, Any]]:
-    """Search for entities in OpenSanctions database."""
+    """Search for entities in OpenSanctions database.
+
+    Results are shared across processes through Redis when it is configured.
+    """
     if datasets is None:
         datasets = DEFAULT_DATASETS
 
@@ -112,71 +221,105 @@ async def search_entity(
         "limit": limit,
         "fuzzy": str(fuzzy).lower(),
     }
+    cache_key = (
+        "sanc:" + hashlib.sha1(orjson.dumps(params, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    )
+
+    cached = await redis_client.cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    data = await _make_request("/search/", params)
+    results = data.get("results", [])
+    logger.info("Found %d results for query: %s", len(results), query)
+    await redis_client.cache_set(cache_key, results, OPENSANCTIONS_CACHE_TTL_REDIS)
+    return results
 
-    try:
-        data = await _make_request("/search/", params)
-        results = data.get("results", [])
-        logger.info(f"Found {len(results)} results for query: {query}")
-        return results
-    except OpenSanctionsError:
-        raise
-    except Exception as e:
-        logger.error(f"Error searching entity: {e}")
-        return []
 
+async def screen_names(
+    names: Iterable[str],
+    schema: str = "Person",
+    limit: int = 10,
+    concurrency: int = OPENSANCTIONS_SCREEN_CONCURRENCY,
+) -> list[dict[str, Any]]:
+    """Search several names concurrently and merge the results.
+
+    At most ``concurrency`` searches run at once. Entities found under more
+    than one name are returned once, with their highest score.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def screen(name: str) -> list[dict[str, Any]]:
+        async with semaphore:
+            return await search_entity(name, schema=schema, limit=limit)
 
+    batches = await asyncio.gather(*(screen(n) for n in dict.fromkeys(names) if n))
+
+    merged: dict[Any, dict[str, Any]] = {}
+    for results in batches:
+        for result in results:
+            key = result.get("id") or id(result)
+            best = merged.get(key)
+            if best is None or result.get("score", 0) > best.get("score", 0):
+                merged[key] = result
+    return list(merged.values())
+
+
+@async_ttl_cache(ttl=OPENSANCTIONS_CACHE_TTL_ENTITY)
 async def get_entity(entity_id: str) -> dict[str, Any]:
     """Get detailed entity information by ID."""
     endpoint = f"/entities/{entity_id}/"
     return await _make_request(endpoint)
 
 
-async def match_entity(
-    name: str,
-    schema: str = "Person",
-    birth_date: Optional[str] = None,
-    country: Optional[str] = None,
+async def match_entities(
+    entities: list[dict[str, Any]],
     datasets: Optional[list[str]] = None,
-) -> list[dict[str, Any]]:
-    """Match entity with structured data."""
+) -> dict[str, list[dict[str, Any]]]:
+    """Match several entities with structured data in a single request.
+
+    Each entity is a dict with a ``name`` and optional ``schema`` (default
+    "Person"), ``birth_date`` and ``country``. Matching is limited to
+    ``datasets`` (default ``DEFAULT_DATASETS``). Results are keyed ``q0``,
+    ``q1``, ... in input order.
+    """
     if datasets is None:
         datasets = DEFAULT_DATASETS
 
-    # Build properties
-    properties: dict[str, Any] = {"name": [name]}
-
-    if birth_date:
-        properties["birthDate"] = [birth_date]
-    if country:
-        properties["country"] = [country]
-
-    try:
-        url = f"{OPENSANCTIONS_BASE_URL}/match/"
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+    queries: dict[str, Any] = {}
+    for i, entity in enumerate(entities):
+        # Build properties
+        properties: dict[str, Any] = {"name": [entity["name"]]}
 
-        if OPENSANCTIONS_API_KEY:
-            headers["Authorization"] = f"Bearer {OPENSANCTIONS_API_KEY}"
+        if entity.get("birth_date"):
+            properties["birthDate"] = [entity["birth_date"]]
+        if entity.get("country"):
+            properties["country"] = [entity["country"]]
 
-        payload = {"schema": schema, "properties": properties}
+        queries[f"q{i}"] = {"schema": entity.get("schema", "Person"), "properties": properties}
 
-        async with httpx.AsyncClient(timeout=OPENSANCTIONS_TIMEOUT) as client:
-            logger.info(f"OpenSanctions Match Request: {url}")
-            response = await client.post(url, headers=headers, json=payload)
+    logger.info("OpenSanctions Match Request: %d queries", len(queries))
+    data = await _make_request(
+        "/match/",
+        {"datasets": ",".join(datasets)},
+        method="POST",
+        json={"queries": queries},
+    )
+    responses = data.get("responses", {})
+    return {key: responses.get(key, {}).get("results", []) for key in queries}
 
-            if response.status_code == 429:
-                raise OpenSanctionsRateLimitError("Rate limit exceeded")
-            elif response.status_code >= 400:
-                raise OpenSanctionsAPIError(f"API error: {response.status_code}")
 
-            response.raise_for_status()
-            data = response.json()
-            return data.get("results", [])
-
-    except OpenSanctionsError:
-        raise
-    except Exception as e:
-        logger.error(f"Error matching entity: {e}")
-        return []
+async def match_entity(
+    name: str,
+    schema: str = "Person",
+    birth_date: Optional[str] = None,
+    country: Optional[str] = None,
+    datasets: Optional[list[str]] = None,
+) -> list[dict[str, Any]]:
+    """Match entity with structured data."""
+    entity = {"name": name, "schema": schema, "birth_date": birth_date, "country": country}
+    results = await match_entities([entity], datasets=datasets)
+    return results["q0"]
 
 
 def calculate_risk_score(matches: list[dict[str, Any]]) -> float:
@@ -188,33 +331,42 @@ def calculate_risk_score(matches: list[dict[str, Any]]) -> float:
     risk_score = max_score * 100
 
     for match in matches:
-        topics = match.get("properties", {}).get("topics", [])
-        if any(topic in ["sanction", "crime", "poi"] for topic in topics):
+        topics = match.get("properties", {}).get("topics", ())
+        if not RISK_TOPICS.isdisjoint(topics):
             risk_score = min(100, risk_score * 1.5)
+            if risk_score == 100:
+                break  # Already at the maximum score
 
     return round(risk_score, 2)
 
 
 def normalize_match_data(match: dict[str, Any]) -> dict[str, Any]:
     """Normalize OpenSanctions match data to internal schema."""
-    properties = match.get("properties", {})
+    get = match.get
+    prop = (get("properties") or {}).get
+    names = prop("name")
 
     return {
-        "entity_id": match.get("id"),
-        "name": properties.get("name", [""])[0] if properties.get("name") else None,
-        "schema": match.get("schema"),
-        "caption": match.get("caption"),
-        "match_score": match.get("score", 0),
-        "datasets": match.get("datasets", []),
-        "topics": properties.get("topics", []),
-        "countries": properties.get("country", []),
-        "birth_date": properties.get("birthDate", [None])[0],
-        "program": properties.get("program", []),
-        "sanctions": properties.get("sanctions", []),
+        "entity_id": get("id"),
+        "name": names[0] if names else None,
+        "schema": get("schema"),
+        "caption": get("caption"),
+        "match_score": get("score", 0),
+        "datasets": get("datasets", []),
+        "topics": prop("topics", []),
+        "countries": prop("country", []),
+        "birth_date": prop("birthDate", [None])[0],
+        "program": prop("program", []),
+        "sanctions": prop("sanctions", []),
         "raw_data": match,
     }
 
 
+def normalize_matches(matches: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Normalize a batch of OpenSanctions matches in one pass."""
+    return list(map(normalize_match_data, matches))
+
+
 # Test entities for development
 TEST_ENTITIES = {
     "sanctioned_person": "Vladimir Putin",
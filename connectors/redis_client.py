@@ -0,0 +1,96 @@
+"""
+Redis Client
+
+Shared Redis connection used as a cross-process cache by the connectors.
+Redis is optional: it is only used when REDIS_URL is set and redis-py is
+installed, otherwise all helpers are no-ops.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Optional
+
+import orjson
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    aioredis = None  # Redis optional
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+# Pool bounds: callers wait at most REDIS_POOL_TIMEOUT for a free connection
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_MIN_CONNECTIONS = int(os.getenv("REDIS_MIN_CONNECTIONS", "5"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "2.0"))
+# Ping idle pooled connections before reuse so dropped ones are replaced transparently
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+
+_redis: Optional[Any] = None
+
+
+def get_redis() -> Optional[Any]:
+    """Return the shared Redis client, or None when Redis is not configured."""
+    global _redis
+    if _redis is None and aioredis is not None and REDIS_URL:
+        pool = aioredis.BlockingConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        _redis = aioredis.Redis(connection_pool=pool)
+    return _redis
+
+
+async def warmup() -> None:
+    """Open ``REDIS_MIN_CONNECTIONS`` pooled connections ahead of the first request.
+
+    Concurrent pings each check out their own connection, which is then kept
+    in the pool. Failures are logged; Redis stays optional.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await asyncio.gather(*(redis.ping() for _ in range(REDIS_MIN_CONNECTIONS)))
+    except Exception as e:
+        logger.warning(f"Redis warmup failed: {e}")
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client (called on application shutdown)."""
+    global _redis
+    if _redis is not None:
+        # The client was given its own pool, so it does not close the pool by default
+        await _redis.aclose(close_connection_pool=True)
+        _redis = None
+
+
+async def cache_get(key: str) -> Optional[Any]:
+    """Return the JSON value stored under ``key``, or None on a miss or error."""
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        val = await redis.get(key)
+        return None if val is None else orjson.loads(val)
+    except Exception as e:
+        logger.debug(f"Redis get failed for {key}: {e}")
+        return None
+
+
+async def cache_set(key: str, value: Any, ttl: int) -> None:
+    """Store ``value`` as JSON under ``key`` with a TTL; errors are logged and ignored."""
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.set(key, orjson.dumps(value), ex=ttl)
+    except Exception as e:
+        logger.debug(f"Redis set failed for {key}: {e}")
@@ -13,151 +13,169 @@ This is intentionally a pragmatic, Copilot-friendly skeleton with TODOs for cach
 """
 
 import asyncio
+import functools
 import logging
 import os
-from datetime import datetime
+import re
+import time
 from typing import Any, Optional
 
-try:
-    import aioredis
-except Exception:
-    aioredis = None  # Redis optional for now
-
+import orjson
 from core.scoring import compute_risk
 
+from connectors._cache import AsyncTTLCache
+from connectors._time import now_iso
 from connectors.kvk_connector import get_basisprofiel as kvk_basisprofiel
 from connectors.kvk_connector import search_company as kvk_search
 from connectors.opensanctions_connector import search as opensanctions_search
+from connectors.redis_client import get_redis
 
 logger = logging.getLogger("mcp-orchestrator")
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 CACHE_TTL_SEARCH = int(os.getenv("CACHE_TTL_SEARCH", "900"))  # 15 minutes default
 CACHE_TTL_PROFILE = int(os.getenv("CACHE_TTL_PROFILE", "86400"))  # 24 hours
 
-# Simple in-process cache fallback (for local dev) when Redis not configured
-_inprocess_cache: dict[str, dict[str, Any]] = {}
+# Query classification: registration numbers are digits, VAT numbers a country prefix + digits
+# (spaces allowed in the digit part). Leading spaces are matched before the first digit so
+# a failed fullmatch stays linear in the query length
+_REG_NUMBER_RE = re.compile(r" *\d[\d ]*")
+_VAT_RE = re.compile(r"[A-Za-z]{2} *\d[\d ]*")
+
+# Cached payloads above this size (bytes) are decoded in a worker thread so a large
+# sanctions result does not stall the event loop; below it the thread hop costs more
+JSON_THREAD_THRESHOLD = int(os.getenv("JSON_THREAD_THRESHOLD", "65536"))
+
+# Bounded in-process cache fallback (for local dev) when Redis not configured
+_inprocess_cache = AsyncTTLCache(
+    maxsize=int(os.getenv("INPROCESS_CACHE_SIZE", "10000")), ttl=CACHE_TTL_PROFILE
+)
+
+
+async def _loads_async(buf: bytes) -> Any:
+    if len(buf) < JSON_THREAD_THRESHOLD:
+        return orjson.loads(buf)
+    return await asyncio.to_thread(orjson.loads, buf)
+
+
+async def _redis_cache_get(key: str) -> Optional[Any]:
+    if time.monotonic() < _redis_skip_until:
+        return await _local_cache_get(key)
+    try:
+        val = await get_redis().get(key)
+        if val is None:
+            return None
+        # assume JSON stored as bytes
+        return await _loads_async(val)
+    except Exception as e:
+        _skip_redis("get", key, e)
+        return await _local_cache_get(key)
+
+
+async def _redis_cache_set(key: str, value: Any, ttl: int = 300) -> None:
+    if time.monotonic() < _redis_skip_until:
+        await _local_cache_set(key, value, ttl=ttl)
+        return
+    try:
+        await get_redis().set(key, orjson.dumps(value), ex=ttl)
+    except Exception as e:
+        _skip_redis("set", key, e)
+        await _local_cache_set(key, value, ttl=ttl)
+
+
+async def _local_cache_get(key: str) -> Optional[Any]:
+    return _inprocess_cache.get(key)
 
 
-async def _get_redis() -> Optional[aioredis.Redis]:
-    if not aioredis:
-        return None
+async def _local_cache_set(key: str, value: Any, ttl: int = 300) -> None:
+    _inprocess_cache.set(key, value, ttl=ttl)
+
+
+# After a Redis error the in-process cache is used for REDIS_CACHE_COOLDOWN seconds, so a
+# Redis outage is not retried on every lookup but a transient error does not stick
+REDIS_CACHE_COOLDOWN = float(os.getenv("REDIS_CACHE_COOLDOWN", "5"))
+_redis_skip_until = 0.0
+
+
+def _skip_redis(op: str, key: str, exc: Exception) -> None:
+    """Use the in-process cache for the next REDIS_CACHE_COOLDOWN seconds."""
+    global _redis_skip_until
+    logger.warning("Redis %s failed for %s, using in-process cache: %s", op, key, exc)
+    _redis_skip_until = time.monotonic() + REDIS_CACHE_COOLDOWN
+
+
+# Cache backend, bound once: Redis when configured, else the in-process fallback (see init_cache)
+if get_redis() is not None:
+    cache_get, cache_set = _redis_cache_get, _redis_cache_set
+else:
+    cache_get, cache_set = _local_cache_get, _local_cache_set
+
+
+async def init_cache() -> bool:
+    """Probe Redis once and bind cache_get/cache_set to the live backend.
+
+    Optional on server startup: when Redis is configured but unreachable, the
+    in-process fallback is then bound for good instead of being retried after
+    every cooldown. Call again to switch back to Redis. Returns True if Redis
+    is used.
+    """
+    global cache_get, cache_set
+    redis = get_redis()
     try:
-        return await aioredis.from_url(REDIS_URL)
+        live = redis is not None and bool(await redis.ping())
     except Exception as e:
-        logger.warning("Redis not available: %s", e)
-        return None
-
-
-async def cache_get(key: str) -> Optional[Any]:
-    redis = await _get_redis()
-    if redis:
-        try:
-            val = await redis.get(key)
-            if val is None:
-                return None
-            # assume JSON stored as bytes
-            import json
-
-            return json.loads(val)
-        except Exception as e:
-            logger.debug("Redis get failed for %s: %s", key, e)
-    # fallback in-process
-    item = _inprocess_cache.get(key)
-    if item and item.get("expires_at") and item["expires_at"] > datetime.utcnow().timestamp():
-        return item.get("value")
-    return None
-
-
-async def cache_set(key: str, value: Any, ttl: int = 300) -> None:
-    redis = await _get_redis()
-    if redis:
-        try:
-            import json
-
-            await redis.set(key, json.dumps(value), ex=ttl)
-            return
-        except Exception as e:
-            logger.debug("Redis set failed for %s: %s", key, e)
-    # fallback
-    _inprocess_cache[key] = {"value": value, "expires_at": datetime.utcnow().timestamp() + ttl}
+        logger.warning("Redis not available, using in-process cache: %s", e)
+        live = False
+    if live:
+        cache_get, cache_set = _redis_cache_get, _redis_cache_set
+    else:
+        cache_get, cache_set = _local_cache_get, _local_cache_set
+    return live
 
 
 # Utilities
 
 
 def _normalize_query(query: str) -> dict[str, Any]:
-    q = query.strip()
-    result = {
-        "raw": q,
-        "is_reg_number": False,
-        "is_vat": False,
-        "normalized_name": None,
+    raw, is_reg_number, is_vat, normalized_name = _classify_query(query.strip())
+    return {
+        "raw": raw,
+        "is_reg_number": is_reg_number,
+        "is_vat": is_vat,
+        "normalized_name": normalized_name,
     }
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify_query(q: str) -> tuple[str, bool, bool, str]:
+    """Classify a stripped query; memoized since agents repeat the same queries."""
     # naive registration number detection: all digits (allow spaces)
-    if q.replace(" ", "").isdigit():
-        result["is_reg_number"] = True
+    is_reg_number = _REG_NUMBER_RE.fullmatch(q) is not None
     # naive VAT detection: starts with 2 letters + digits
-    if len(q) > 2 and q[:2].isalpha() and q[2:].replace(" ", "").isdigit():
-        result["is_vat"] = True
+    is_vat = _VAT_RE.fullmatch(q) is not None
     # basic normalized name
-    result["normalized_name"] = q.lower()
-    return result
+    return q, is_reg_number, is_vat, q.lower()
 
 
-async def orchestrator_get_company_profile(params: dict[str, Any]) -> dict[str, Any]:
-    """Main orchestrator entrypoint called by the FastAPI handler.
+async def _do_registry(
+    norm: dict[str, Any],
+    country: str,
+    premium: bool,
+    company: dict[str, Any],
+    basic_checks: dict[str, Any],
+) -> tuple[list[str], dict[str, Any]]:
+    """Fill company and basic_checks from the country registry.
 
-    Steps implemented here:
-     - normalize input
-     - check cache
-     - call registry connector(s)
-     - call sanctions provider(s)
-     - merge and compute risk
-     - return unified CompanyProfileV1
-
-    This is intentionally conservative: it returns partial results on connector failures and logs errors.
+    Returns the (sources, raw_calls) audit entries.
     """
-    country = params.get("country", "").upper()
-    query = params.get("query", "").strip()
-    premium = bool(params.get("premium", False))
-    # TODO: Feature not yet implemented
-
-    norm = _normalize_query(query)
-    cache_key = f"profile:{country}:{norm['raw']}:{'premium' if premium else 'basic'}"
-    # 1) try cache
-    cached = await cache_get(cache_key)
-    if cached:
-        logger.info("Cache hit for %s", cache_key)
-        return cached
-
-    # Prepare response skeleton
-    company = {
-        "name": None,
-        "country": country,
-        "registration_number": None,
-        "vat_number": None,
-        "kvk_number": None,
-        "status": "unknown",
-        "registered_address": None,
-        "legal_form": None,
-        "sbi_codes": [],
-    }
-    basic_checks = {
-        "vat_valid": None,
-        "reg_verified": False,
-        "last_data_pull": datetime.utcnow().isoformat() + "Z",
-    }
-    sanctions_section = {"hits_count": 0, "matches": []}
-    audit = {"sources": [], "raw_calls": {}}
-
-    # 2) Registry lookup
+    sources: list[str] = []
+    raw_calls: dict[str, Any] = {}
     try:
         if country == "NL":
+            raw = norm["raw"]
             # If it's detected as a reg number and premium, try basisprofiel first
             if norm["is_reg_number"] and premium:
-                bp = await kvk_basisprofiel(norm["raw"])  # connector maps minimal fields
-                audit["raw_calls"]["kvk_basisprofiel"] = {"fetched": bool(bp)}
+                bp = await kvk_basisprofiel(raw)  # connector maps minimal fields
+                raw_calls["kvk_basisprofiel"] = {"fetched": bool(bp)}
                 if bp:
                     company["name"] = bp.get("name")
                     company["kvk_number"] = bp.get("kvkNumber")
@@ -166,11 +184,11 @@ async def orchestrator_get_company_profile(params: dict[str, Any]) -> dict[str,
                     company["registered_address"] = bp.get("address")
                     company["status"] = bp.get("status") or "unknown"
                     basic_checks["reg_verified"] = True
-                    audit["sources"].append(f"kvk:basisprofiel:{company.get('kvk_number')}")
+                    sources.append(f"kvk:basisprofiel:{company.get('kvk_number')}")
             else:
                 # Search
-                sr = await kvk_search(norm["raw"]) or {}
-                audit["raw_calls"]["kvk_search"] = {
+                sr = await kvk_search(raw) or {}
+                raw_calls["kvk_search"] = {
                     "result_count": len(sr.get("data", [])) if isinstance(sr, dict) else None
                 }
                 hits = sr.get("data") if isinstance(sr, dict) else []
@@ -182,44 +200,111 @@ async def orchestrator_get_company_profile(params: dict[str, Any]) -> dict[str,
                     company["status"] = it.get("status") or company["status"]
                     company["registered_address"] = it.get("address")
                     basic_checks["reg_verified"] = True
-                    audit["sources"].append(f"kvk:search:{company.get('kvk_number')}")
+                    sources.append(f"kvk:search:{company.get('kvk_number')}")
                 else:
-                    audit["sources"].append(
+                    sources.append(
                         f"kvk:search:multiple_or_none:{len(hits) if hits is not None else 'unknown'}"
                     )
         elif country == "BE":
             # TODO: call CBE connector; for now mark skipped
-            audit["sources"].append("cbe:skipped")
+            sources.append("cbe:skipped")
         elif country == "LU":
             # TODO: call LBR connector
-            audit["sources"].append("lbr:skipped")
+            sources.append("lbr:skipped")
         else:
-            audit["sources"].append("registry:unknown_country")
+            sources.append("registry:unknown_country")
     except Exception as e:
         logger.exception("Registry lookup failed: %s", e)
-        audit["raw_calls"]["registry_error"] = {"error": str(e)}
+        raw_calls["registry_error"] = {"error": str(e)}
+    return sources, raw_calls
+
 
-    # 3) Sanctions/PEP screening
+async def _do_sanctions(query: str) -> tuple[dict[str, Any], list[str], dict[str, Any]]:
+    """Screen query against the sanctions provider.
+
+    Returns (sanctions_section, sources, raw_calls).
+    """
+    sanctions_section = {"hits_count": 0, "matches": []}
+    sources: list[str] = []
+    raw_calls: dict[str, Any] = {}
     try:
         osr = await opensanctions_search(query)
         matches = osr.get("matches") if isinstance(osr, dict) else []
-        sanctions_section["hits_count"] = len(matches)
-        for m in matches:
-            sanctions_section["matches"].append(
-                {
-                    "source": m.get("source") or "opensanctions",
-                    "entity_id": m.get("id"),
-                    "confidence": float(m.get("confidence", 0.8)),
-                    "matched_name": m.get("name"),
-                    "raw": m.get("raw") if isinstance(m.get("raw", None), dict) else m.get("raw"),
-                }
-            )
-        audit["raw_calls"]["opensanctions"] = {"result_count": sanctions_section["hits_count"]}
-        if sanctions_section["hits_count"]:
-            audit["sources"].append("opensanctions")
+        hits_count = len(matches)
+        sanctions_section["hits_count"] = hits_count
+        sanctions_section["matches"] = [
+            {
+                "source": m.get("source") or "opensanctions",
+                "entity_id": m.get("id"),
+                "confidence": float(m.get("confidence", 0.8)),
+                "matched_name": m.get("name"),
+                "raw": m.get("raw"),
+            }
+            for m in matches
+        ]
+        raw_calls["opensanctions"] = {"result_count": hits_count}
+        if hits_count:
+            sources.append("opensanctions")
     except Exception as e:
         logger.exception("Sanctions provider failed: %s", e)
-        audit["raw_calls"]["opensanctions_error"] = {"error": str(e)}
+        raw_calls["opensanctions_error"] = {"error": str(e)}
+    return sanctions_section, sources, raw_calls
+
+
+async def orchestrator_get_company_profile(params: dict[str, Any]) -> dict[str, Any]:
+    """Main orchestrator entrypoint called by the FastAPI handler.
+
+    Steps implemented here:
+     - normalize input
+     - check cache
+     - call registry connector(s)
+     - call sanctions provider(s)
+     - merge and compute risk
+     - return unified CompanyProfileV1
+
+    This is intentionally conservative: it returns partial results on connector failures and logs errors.
+    """
+    country = params.get("country", "").upper()
+    query = params.get("query", "").strip()
+    premium = bool(params.get("premium", False))
+    # TODO: Feature not yet implemented
+
+    norm = _normalize_query(query)
+    raw = norm["raw"]
+    cache_key = f"profile:{country}:{raw}:{'premium' if premium else 'basic'}"
+    # 1) try cache
+    # The TTL is a hard cap on profile age: hits never extend it, so sanctions data is re-screened
+    cached = await cache_get(cache_key)
+    if cached:
+        logger.info("Cache hit for %s", cache_key)
+        return cached
+
+    # Prepare response skeleton
+    company = {
+        "name": None,
+        "country": country,
+        "registration_number": None,
+        "vat_number": None,
+        "kvk_number": None,
+        "status": "unknown",
+        "registered_address": None,
+        "legal_form": None,
+        "sbi_codes": [],
+    }
+    basic_checks = {
+        "vat_valid": None,
+        "reg_verified": False,
+        "last_data_pull": now_iso(),
+    }
+    # 2) Registry lookup and 3) sanctions/PEP screening are independent; run them concurrently
+    (sources, raw_calls), (sanctions_section, sanctions_sources, sanctions_calls) = (
+        await asyncio.gather(
+            _do_registry(norm, country, premium, company, basic_checks),
+            _do_sanctions(query),
+        )
+    )
+    sources += sanctions_sources
+    raw_calls.update(sanctions_calls)
 
     # 4) Compute risk
     scoring_input = {
@@ -237,7 +322,7 @@ async def orchestrator_get_company_profile(params: dict[str, Any]) -> dict[str,
         "basic_checks": basic_checks,
         "sanctions": sanctions_section,
         "risk_score": risk,
-        "audit": audit,
+        "audit": {"sources": sources, "raw_calls": raw_calls},
     }
 
     # 5) cache profile for a longer TTL (profiles change less frequently)
@@ -256,4 +341,4 @@ async def _parallel_map(coros: list[Any]) -> list[Any]:
 
 
 # Exported for import by FastAPI main
-__all__ = ["orchestrator_get_company_profile"]
+__all__ = ["init_cache", "orchestrator_get_company_profile"]
@@ -4,27 +4,78 @@ Compliance Copilot MCP Server - FastAPI Application
 Main API server for compliance checks, company profile lookups, and risk scoring.
 """
 
-from datetime import datetime
-from typing import Optional
-
-from fastapi import FastAPI, HTTPException, Path, Query
+import asyncio
+import hashlib
+import os
+from bisect import bisect_right
+from collections.abc import AsyncIterator, Awaitable
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi import FastAPI, HTTPException, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
 
+from connectors import kvk_connector, opensanctions_connector, redis_client
+from connectors._time import now_iso
 from connectors.kvk_connector import (
     KVKError,
     KVKNotFoundError,
     get_basisprofiel,
+    get_eigenaar,
+    get_vestigingen,
     normalize_company_data,
     search_company,
 )
 from connectors.opensanctions_connector import OpenSanctionsError
 from connectors.opensanctions_connector import calculate_risk_score as calculate_sanctions_risk
-from connectors.opensanctions_connector import normalize_match_data, search_entity
+from connectors.opensanctions_connector import normalize_matches, screen_names, search_entity
 
 # Version and metadata
 __version__ = "0.1.0"
 
+# KVK numbers are exactly eight ASCII digits
+KVK_NUMBER_PATTERN = r"^[0-9]{8}$"
+
+# Client cache lifetime (seconds) for profile responses, revalidated through the ETag
+PROFILE_CACHE_MAX_AGE = int(os.getenv("PROFILE_CACHE_MAX_AGE", "3600"))
+
+# Risk level for overall scores from each threshold upwards (below 25 is LOW)
+RISK_LEVEL_THRESHOLDS = (25, 50, 75)
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH", "CRITICAL")
+
+# Line-delimited alternative to the JSON array returned by list endpoints
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Redis cache TTLs (seconds); KVK data changes on the order of days
+CACHE_TTL_SEARCH = int(os.getenv("CACHE_TTL_SEARCH", "900"))
+CACHE_TTL_PROFILE = int(os.getenv("CACHE_TTL_PROFILE", "86400"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Open the shared upstream clients on startup and close them on shutdown."""
+    # Pre-establish pooled connections to the upstream APIs and Redis in the
+    # background, so a slow upstream does not hold back serving traffic
+    app.state.warmup_task = asyncio.create_task(_warmup())
+
+    yield
+
+    app.state.warmup_task.cancel()
+    await kvk_connector.close_client()
+    await opensanctions_connector.close_client()
+    await redis_client.close_redis()
+
+
+async def _warmup() -> None:
+    """Open pooled connections to the upstream APIs and Redis."""
+    await asyncio.gather(
+        kvk_connector.warmup(), opensanctions_connector.warmup(), redis_client.warmup()
+    )
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Compliance Copilot MCP Server",
@@ -46,6 +97,8 @@ Real-time compliance checks, company profile lookups, and risk scoring.
 - 🐛 Issues: [GitHub](https://github.com/TCLUBNL/compliance_copilot_mcp_server/issues)
     """,
     version=__version__,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
     contact={
         "name": "TCLUB NL Support",
         "url": "https://github.com/TCLUBNL/compliance_copilot_mcp_server",
@@ -74,6 +127,50 @@ app.add_middleware(
 )
 
 
+# Pending loads keyed by request signature, shared by concurrent identical requests
+_inflight: dict[str, asyncio.Future] = {}
+
+
+async def singleflight(key: str, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Run ``coro_factory`` at most once per ``key`` at a time.
+
+    Concurrent callers with the same key await the same pending result.
+    """
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(coro_factory())
+        # Mark the error retrieved even when every caller was cancelled before it finished
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shield so a disconnecting client does not cancel the load for the others
+    return await asyncio.shield(future)
+
+
+async def cached_call(key: str, ttl: int, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the Redis-cached value for ``key``, computing and storing it on a miss.
+
+    Concurrent misses for the same key share one lookup. Falls through to
+    ``coro_factory`` when Redis is not configured or unavailable.
+    """
+    return await singleflight(key, lambda: _load_cached(key, ttl, coro_factory))
+
+
+async def _load_cached(key: str, ttl: int, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+    cached = await redis_client.cache_get(key)
+    if cached is not None:
+        return cached
+
+    value = await coro_factory()
+    await redis_client.cache_set(key, value, ttl)
+    return value
+
+
+def _profile_cache_key(kvk_number: str) -> str:
+    """Redis key for a cached KVK basisprofiel."""
+    return f"kvk:profile:{kvk_number}"
+
+
 # Models
 class HealthResponse(BaseModel):
     status: str = Field(..., example="healthy")
@@ -127,58 +224,94 @@ class RiskAssessment(BaseModel):
     checked_at: str = Field(..., example="2025-10-28T08:52:00Z")
 
 
+# Static response bodies, serialized once; /health only changes once per second
+_ROOT_BYTES = orjson.dumps(
+    {
+        "name": "Compliance Copilot MCP Server",
+        "version": __version__,
+        "docs": "/docs",
+    }
+)
+_health_cache: list = ["", b""]
+
+
 @app.get("/health", tags=["health"], response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
-    return HealthResponse(
-        status="healthy",
-        version=__version__,
-        timestamp=datetime.utcnow().isoformat() + "Z",
-    )
+    timestamp = now_iso()
+    if timestamp != _health_cache[0]:
+        _health_cache[1] = HealthResponse(
+            status="healthy",
+            version=__version__,
+            timestamp=timestamp,
+        ).model_dump_json()
+        _health_cache[0] = timestamp
+    return Response(_health_cache[1], media_type="application/json")
 
 
 @app.get("/", tags=["health"])
 async def root():
     """Root endpoint."""
-    return {
-        "name": "Compliance Copilot MCP Server",
-        "version": __version__,
-        "docs": "/docs",
-    }
+    return Response(_ROOT_BYTES, media_type="application/json")
 
 
 @app.get("/api/v1/search", tags=["search"], response_model=list[CompanySearchResult])
 async def search_companies_endpoint(
+    request: Request,
     query: str = Query(..., description="Company name or KVK number", example="test"),
     city: str = Query(None, description="Filter by city"),
     limit: int = Query(default=10, ge=1, le=100),
 ):
-    """Search for companies in the KVK database."""
+    """Search for companies in the KVK database.
+
+    Send ``Accept: application/x-ndjson`` to receive one result per line.
+    """
     try:
-        results = await search_company(query, city=city, max_results=limit)
-        return [
-            CompanySearchResult(
-                kvk_number=r.get("kvkNummer", ""),
-                name=r.get("naam", ""),
-                city=r.get("plaats"),
-                match_score=1.0,
-            )
-            for r in results
-        ]
+        params = {"query": query, "city": city, "limit": limit}
+        digest = hashlib.sha1(orjson.dumps(params, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        results = await cached_call(
+            f"kvk:search:{digest}",
+            CACHE_TTL_SEARCH,
+            lambda: search_company(query, city=city, max_results=limit),
+        )
+        # Serialized per item so the JSON array and NDJSON bodies share one encoder
+        items = [_search_result_json(r) for r in results]
     except KVKError as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
+    except ValidationError as e:
+        raise HTTPException(status_code=500, detail="Invalid KVK search result") from e
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return Response("".join(item + "\n" for item in items), media_type=NDJSON_MEDIA_TYPE)
+    return Response("[" + ",".join(items) + "]", media_type="application/json")
+
+
+def _search_result_json(r: dict[str, Any]) -> str:
+    """Serialize one KVK search result as a CompanySearchResult JSON object."""
+    return CompanySearchResult(
+        kvk_number=r.get("kvkNummer", ""),
+        name=r.get("naam", ""),
+        city=r.get("plaats"),
+        match_score=1.0,
+    ).model_dump_json()
 
 
 @app.get("/api/v1/profile/{kvk_number}", tags=["profiles"], response_model=CompanyProfile)
 async def get_company_profile_endpoint(
-    kvk_number: str = Path(..., regex="^[0-9]{8}$", example="68750110")
+    request: Request,
+    kvk_number: str = Path(..., pattern=KVK_NUMBER_PATTERN, example="68750110"),
 ):
-    """Get detailed company profile."""
+    """Get detailed company profile.
+
+    Responses carry an ETag; a matching ``If-None-Match`` returns 304 Not Modified.
+    """
     try:
-        profile = await get_basisprofiel(kvk_number)
+        profile = await cached_call(
+            _profile_cache_key(kvk_number), CACHE_TTL_PROFILE, lambda: get_basisprofiel(kvk_number)
+        )
         normalized = normalize_company_data(profile)
 
-        return CompanyProfile(
+        result = CompanyProfile(
             kvk_number=normalized["kvk_number"],
             name=normalized["name"],
             trade_names=normalized["trade_names"],
@@ -193,6 +326,17 @@ async def get_company_profile_endpoint(
     except KVKError as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
+    body = result.model_dump_json().encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"max-age={PROFILE_CACHE_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
 
 @app.get(
     "/api/v1/sanctions/screen",
@@ -219,13 +363,13 @@ async def screen_sanctions(
         results = await search_entity(name, schema=schema, limit=limit)
 
         # Normalize results
-        matches = [normalize_match_data(r) for r in results]
+        matches = normalize_matches(results)
 
         # Calculate risk score
         risk_score = calculate_sanctions_risk(results)
 
         # Build response
-        return SanctionsScreeningResult(
+        result = SanctionsScreeningResult(
             query=name,
             matches=[
                 SanctionsMatch(
@@ -241,70 +385,103 @@ async def screen_sanctions(
             ],
             total_matches=len(matches),
             risk_score=risk_score,
-            checked_at=datetime.utcnow().isoformat() + "Z",
+            checked_at=now_iso(),
         )
     except OpenSanctionsError as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
+    return Response(result.model_dump_json(), media_type="application/json")
+
 
 @app.get("/api/v1/risk/{kvk_number}", tags=["risk"], response_model=RiskAssessment)
 async def get_risk_assessment_endpoint(
-    kvk_number: str = Path(..., regex="^[0-9]{8}$", example="68750110")
+    kvk_number: str = Path(..., pattern=KVK_NUMBER_PATTERN, example="68750110")
 ):
     """
     Comprehensive risk assessment combining KVK and sanctions data.
     """
     try:
-        # Get company profile
-        profile = await get_basisprofiel(kvk_number)
+        profile = await cached_call(
+            _profile_cache_key(kvk_number), CACHE_TTL_PROFILE, lambda: get_basisprofiel(kvk_number)
+        )
         normalized = normalize_company_data(profile)
         company_name = normalized["name"] or "Unknown"
 
-        # Screen for sanctions
-        sanctions_results = await search_entity(company_name, schema="Organization", limit=10)
-        sanctions_hits = len(sanctions_results)
-        sanctions_risk = calculate_sanctions_risk(sanctions_results)
+        # Screen the legal and trade names while the best-effort owner and establishment
+        # lookups run; they start only once the profile shows the company exists
+        sanctions_results, owner, vestigingen = await asyncio.gather(
+            screen_names(
+                [company_name, *normalized["trade_names"]], schema="Organization", limit=10
+            ),
+            _best_effort(get_eigenaar(kvk_number)),
+            _best_effort(get_vestigingen(kvk_number)),
+        )
 
-        # Calculate overall risk
         base_risk = 10.0  # Base risk for any company
-        overall_risk = base_risk + (sanctions_risk * 0.9)  # Weight sanctions heavily
-
-        # Determine risk level
-        if overall_risk >= 75:
-            risk_level = "CRITICAL"
-        elif overall_risk >= 50:
-            risk_level = "HIGH"
-        elif overall_risk >= 25:
-            risk_level = "MEDIUM"
+        sanctions_hits = len(sanctions_results)
+        if sanctions_hits:
+            sanctions_risk = calculate_sanctions_risk(sanctions_results)
+            overall_risk = base_risk + (sanctions_risk * 0.9)  # Weight sanctions heavily
+            factors = [f"{sanctions_hits} potential sanctions matches"]
         else:
-            risk_level = "LOW"
+            # Common case: a clean company scores the base risk
+            overall_risk = base_risk
+            factors = ["No sanctions matches found"]
 
-        # Build factors
-        factors = []
-        if sanctions_hits == 0:
-            factors.append("No sanctions matches found")
-        else:
-            factors.append(f"{sanctions_hits} potential sanctions matches")
+        risk_level = RISK_LEVELS[bisect_right(RISK_LEVEL_THRESHOLDS, overall_risk)]
 
+        # Add company factors
         if normalized.get("status"):
             factors.append(f"Company status: {normalized['status']}")
 
-        return RiskAssessment(
+        if isinstance(owner, dict) and owner.get("rechtsvorm"):
+            factors.append(f"Owner legal form: {owner['rechtsvorm']}")
+
+        if isinstance(vestigingen, list):
+            factors.append(f"{len(vestigingen)} registered establishments")
+
+        result = RiskAssessment(
             kvk_number=kvk_number,
             company_name=company_name,
             risk_score=round(overall_risk, 2),
             risk_level=risk_level,
             factors=factors,
             sanctions_hits=sanctions_hits,
-            checked_at=datetime.utcnow().isoformat() + "Z",
+            checked_at=now_iso(),
         )
     except KVKNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e)) from e
     except (KVKError, OpenSanctionsError) as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
+    return Response(result.model_dump_json(), media_type="application/json")
+
+
+async def _best_effort(coro: Awaitable[Any]) -> Any:
+    """Await an optional KVK lookup, returning None if it fails."""
+    try:
+        return await coro
+    except KVKError:
+        return None
+
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # The rate limiters are per process unless REDIS_URL shares their windows, so
+    # more than one worker would multiply the upstream request rate
+    default_workers = (os.cpu_count() or 1) if os.getenv("REDIS_URL") else 1
+
+    # uvloop and httptools ship with uvicorn[standard]
+    uvicorn.run(
+        "services.mcp_server.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", str(default_workers))),
+        # Outlive typical load balancer idle timeouts (60s) so kept-alive
+        # connections are closed by the balancer, never mid-request by us
+        timeout_keep_alive=int(os.getenv("KEEPALIVE_TIMEOUT", "75")),
+        log_level=os.getenv("LOG_LEVEL", "warning"),
+    )
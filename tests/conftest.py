@@ -0,0 +1,26 @@
+"""
+Shared test fixtures
+"""
+
+import pytest
+
+from connectors import kvk_connector, opensanctions_connector
+
+# Connector lookups memoized in-process by async_ttl_cache
+_CACHED_LOOKUPS = (
+    kvk_connector.search_company,
+    kvk_connector.get_basisprofiel,
+    kvk_connector.get_eigenaar,
+    kvk_connector.get_hoofdvestiging,
+    kvk_connector.get_vestigingen,
+    opensanctions_connector.search_entity,
+    opensanctions_connector.get_entity,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_connector_caches():
+    """Start every test with empty connector caches, so results never leak between tests."""
+    for lookup in _CACHED_LOOKUPS:
+        lookup.cache_clear()
+    yield
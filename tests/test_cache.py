@@ -0,0 +1,107 @@
+"""
+Tests for the connector TTL cache
+"""
+
+import asyncio
+import gc
+from unittest.mock import patch
+
+import pytest
+
+from connectors._cache import AsyncTTLCache, async_ttl_cache
+
+
+def test_cache_set_and_get():
+    """Test storing and retrieving a value."""
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    cache.set("key", {"value": 1})
+    assert cache.get("key") == {"value": 1}
+    assert cache.get("missing") is None
+
+
+def test_cache_expiry():
+    """Test entries expire after the TTL."""
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    with patch("connectors._cache.time.monotonic", return_value=1000.0):
+        cache.set("key", "value")
+    with patch("connectors._cache.time.monotonic", return_value=1061.0):
+        assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_cache_per_entry_ttl():
+    """Test a TTL passed to set overrides the cache-wide TTL."""
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    with patch("connectors._cache.time.monotonic", return_value=1000.0):
+        cache.set("short", "value", ttl=5)
+        cache.set("default", "value")
+    with patch("connectors._cache.time.monotonic", return_value=1006.0):
+        assert cache.get("short") is None
+        assert cache.get("default") == "value"
+
+
+def test_cache_lru_eviction():
+    """Test the least recently used entry is evicted when full."""
+    cache = AsyncTTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_function_coalesces_concurrent_calls():
+    """Test concurrent identical calls share one upstream call."""
+    calls = []
+
+    @async_ttl_cache(ttl=60)
+    async def fetch(key, tags=None):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    results = await asyncio.gather(*(fetch("abc", tags=["x"]) for _ in range(5)))
+    assert results == ["ABC"] * 5
+    assert await fetch("abc", tags=["x"]) == "ABC"
+    assert calls == ["abc"]
+
+
+@pytest.mark.asyncio
+async def test_cached_function_does_not_cache_errors():
+    """Test exceptions are propagated and not cached."""
+    calls = []
+
+    @async_ttl_cache(ttl=60)
+    async def fetch(key):
+        calls.append(key)
+        raise ValueError("upstream failure")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await fetch("abc")
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_load_after_cancelled_caller_is_retrieved():
+    """Test a load failing after its only caller was cancelled does not log an unretrieved error."""
+    cache = AsyncTTLCache(maxsize=10, ttl=60)
+    errors = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failure")
+
+    caller = asyncio.ensure_future(cache.get_or_load("a", load))
+    await asyncio.sleep(0)
+    caller.cancel()
+    await asyncio.sleep(0.05)
+    # The cancelled caller's traceback keeps the load alive; drop it so the load is collected
+    del caller
+    gc.collect()
+
+    assert errors == []
@@ -79,3 +79,21 @@ def test_normalize_empty_data():
     normalized = normalize_company_data({})
     assert normalized["kvk_number"] is None
     assert normalized["name"] is None
+
+
+def test_normalize_establishment_address():
+    """Test the main establishment address is normalized."""
+    kvk_data = {
+        "kvkNummer": "12345678",
+        "_embedded": {
+            "hoofdvestiging": {
+                "adressen": [{"straatnaam": "Damrak", "huisnummer": 1, "plaats": "Amsterdam"}]
+            }
+        },
+    }
+
+    address = normalize_company_data(kvk_data)["establishment_address"]
+
+    assert address["street"] == "Damrak"
+    assert address["city"] == "Amsterdam"
+    assert address["country"] == "Nederland"
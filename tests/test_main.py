@@ -0,0 +1,192 @@
+"""
+Tests for the FastAPI application
+
+Exercises the endpoints with the connectors patched out.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from connectors.kvk_connector import KVKError, KVKNotFoundError
+from services.mcp_server import main
+
+PROFILE = {
+    "kvkNummer": "68750110",
+    "naam": "Test BV",
+    "statutaireNaam": "Test BV",
+    "handelsNamen": ["Test Trading"],
+}
+
+
+@pytest.fixture
+def client():
+    """Test client without the lifespan hook, so no upstream warmup runs."""
+    return TestClient(main.app)
+
+
+@patch("services.mcp_server.main.search_company", new_callable=AsyncMock)
+def test_search_returns_results(mock_search, client):
+    """Test search results are returned as a JSON array."""
+    mock_search.return_value = [
+        {"kvkNummer": "12345678", "naam": "Test BV", "plaats": "Amsterdam"},
+        {"kvkNummer": "87654321", "naam": "Other BV"},
+    ]
+
+    response = client.get("/api/v1/search", params={"query": "test"})
+
+    assert response.status_code == 200
+    assert [r["kvk_number"] for r in response.json()] == ["12345678", "87654321"]
+
+
+@patch("services.mcp_server.main.search_company", new_callable=AsyncMock)
+def test_search_invalid_result_is_server_error(mock_search, client):
+    """Test an invalid upstream item fails the whole request."""
+    mock_search.return_value = [{"kvkNummer": None, "naam": "Test BV"}]
+
+    response = client.get("/api/v1/search", params={"query": "test"})
+
+    assert response.status_code == 500
+
+
+@patch("services.mcp_server.main.search_company", new_callable=AsyncMock)
+def test_search_ndjson_on_accept_header(mock_search, client):
+    """Test search results are returned as NDJSON when the client accepts it."""
+    mock_search.return_value = [
+        {"kvkNummer": "12345678", "naam": "Test BV"},
+        {"kvkNummer": "87654321", "naam": "Other BV"},
+    ]
+
+    response = client.get(
+        "/api/v1/search",
+        params={"query": "test"},
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == 2
+    assert '"kvk_number":"87654321"' in lines[1]
+
+
+@patch("services.mcp_server.main.get_basisprofiel", new_callable=AsyncMock)
+def test_profile_etag_not_modified(mock_profile, client):
+    """Test If-None-Match with the current ETag returns 304, in any accepted form."""
+    mock_profile.return_value = PROFILE
+    url = "/api/v1/profile/68750110"
+
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert response.json()["name"] == "Test BV"
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(url, headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304, if_none_match
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+
+@patch("services.mcp_server.main.get_basisprofiel", new_callable=AsyncMock)
+def test_profile_etag_mismatch_returns_body(mock_profile, client):
+    """Test a stale ETag gets the full profile."""
+    mock_profile.return_value = PROFILE
+
+    response = client.get("/api/v1/profile/68750110", headers={"If-None-Match": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.json()["kvk_number"] == "68750110"
+
+
+@pytest.mark.asyncio
+async def test_singleflight_coalesces_concurrent_calls():
+    """Test concurrent callers with the same key share one load."""
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(*(main.singleflight("key", load) for _ in range(5)))
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert not main._inflight
+
+
+@patch("services.mcp_server.main.screen_names", new_callable=AsyncMock)
+@patch("services.mcp_server.main.get_vestigingen", new_callable=AsyncMock)
+@patch("services.mcp_server.main.get_eigenaar", new_callable=AsyncMock)
+@patch("services.mcp_server.main.get_basisprofiel", new_callable=AsyncMock)
+def test_risk_includes_owner_and_establishment_factors(
+    mock_profile, mock_owner, mock_vestigingen, mock_screen, client
+):
+    """Test the risk assessment reports owner legal form and establishment count."""
+    mock_profile.return_value = PROFILE
+    mock_owner.return_value = {"rechtsvorm": "BV"}
+    mock_vestigingen.return_value = [{"vestigingsnummer": "1"}, {"vestigingsnummer": "2"}]
+    mock_screen.return_value = []
+
+    response = client.get("/api/v1/risk/68750110")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["risk_level"] == "LOW"
+    assert "Owner legal form: BV" in data["factors"]
+    assert "2 registered establishments" in data["factors"]
+    mock_screen.assert_awaited_once()
+    assert mock_screen.await_args.args[0] == ["Test BV", "Test Trading"]
+
+
+@patch("services.mcp_server.main.screen_names", new_callable=AsyncMock)
+@patch("services.mcp_server.main.get_vestigingen", new_callable=AsyncMock)
+@patch("services.mcp_server.main.get_eigenaar", new_callable=AsyncMock)
+@patch("services.mcp_server.main.get_basisprofiel", new_callable=AsyncMock)
+def test_risk_tolerates_failed_owner_lookups(
+    mock_profile, mock_owner, mock_vestigingen, mock_screen, client
+):
+    """Test owner and establishment failures only drop their factors."""
+    mock_profile.return_value = PROFILE
+    mock_owner.side_effect = KVKError("owner unavailable")
+    mock_vestigingen.side_effect = KVKError("establishments unavailable")
+    mock_screen.return_value = []
+
+    response = client.get("/api/v1/risk/68750110")
+
+    assert response.status_code == 200
+    factors = response.json()["factors"]
+    assert not any(f.startswith("Owner legal form") for f in factors)
+    assert not any(f.endswith("registered establishments") for f in factors)
+
+
+@patch("services.mcp_server.main.get_vestigingen", new_callable=AsyncMock)
+@patch("services.mcp_server.main.get_eigenaar", new_callable=AsyncMock)
+@patch("services.mcp_server.main.get_basisprofiel", new_callable=AsyncMock)
+def test_risk_unknown_company_skips_owner_lookups(
+    mock_profile, mock_owner, mock_vestigingen, client
+):
+    """Test an unknown KVK number costs only the profile lookup."""
+    mock_profile.side_effect = KVKNotFoundError("not found")
+
+    response = client.get("/api/v1/risk/00000000")
+
+    assert response.status_code == 404
+    mock_owner.assert_not_called()
+    mock_vestigingen.assert_not_called()
+
+
+@patch("services.mcp_server.main.cached_call", new_callable=AsyncMock)
+def test_search_cache_key_separates_parameters(mock_cached_call, client):
+    """Test parameters containing the old separator do not share a cache key."""
+    mock_cached_call.return_value = []
+
+    client.get("/api/v1/search", params={"query": "a|b"})
+    client.get("/api/v1/search", params={"query": "a", "city": "b|None"})
+
+    first, second = (c.args[0] for c in mock_cached_call.call_args_list)
+    assert first.startswith("kvk:search:")
+    assert first != second
@@ -4,14 +4,19 @@ Tests for OpenSanctions Connector
 Tests the OpenSanctions API integration with mocked responses.
 """
 
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
+from tenacity import AsyncRetrying, stop_after_attempt
 
 from connectors.opensanctions_connector import (
     OpenSanctionsAPIError,
     calculate_risk_score,
+    match_entities,
     normalize_match_data,
+    normalize_matches,
+    screen_names,
     search_entity,
 )
 
@@ -135,3 +140,67 @@ def test_normalize_empty_match():
     assert normalized["entity_id"] is None
     assert normalized["name"] is None
     assert normalized["match_score"] == 0
+
+
+def test_normalize_matches_batch():
+    """Test a batch of matches is normalized in order."""
+    matches = [{"id": "a", "properties": {"name": ["A"]}}, {"id": "b", "properties": None}]
+    normalized = normalize_matches(matches)
+    assert [m["entity_id"] for m in normalized] == ["a", "b"]
+    assert [m["name"] for m in normalized] == ["A", None]
+
+
+@pytest.mark.asyncio
+@patch("connectors.opensanctions_connector._get_client")
+async def test_match_entities_single_request(mock_get_client):
+    """Test several entities are matched in one batched request."""
+    response = MagicMock(status_code=200, headers={})
+    response.content = (
+        b'{"responses": {"q0": {"results": [{"id": "test-123"}]}, "q1": {"results": []}}}'
+    )
+    mock_get_client.return_value.request = AsyncMock(return_value=response)
+
+    results = await match_entities(
+        [{"name": "Vladimir Putin"}, {"name": "Rosneft", "schema": "Organization"}],
+        datasets=["sanctions"],
+    )
+
+    assert results == {"q0": [{"id": "test-123"}], "q1": []}
+    mock_get_client.return_value.request.assert_called_once()
+    assert mock_get_client.return_value.request.call_args.args[0] == "POST"
+    assert mock_get_client.return_value.request.call_args.kwargs["params"] == {
+        "datasets": "sanctions"
+    }
+    payload = mock_get_client.return_value.request.call_args.kwargs["json"]
+    assert payload["queries"]["q1"]["schema"] == "Organization"
+    # The client's split connect/read timeout must not be overridden per request
+    assert mock_get_client.return_value.request.call_args.kwargs["timeout"] is (
+        httpx.USE_CLIENT_DEFAULT
+    )
+
+
+@pytest.mark.asyncio
+@patch("connectors.opensanctions_connector.search_entity", new_callable=AsyncMock)
+async def test_screen_names_merges_duplicates(mock_search):
+    """Test each name is searched once and entities are de-duplicated by id."""
+    mock_search.side_effect = lambda name, **kwargs: {
+        "Test BV": [{"id": "a", "score": 0.6}, {"id": "b", "score": 0.9}],
+        "Test Trading": [{"id": "a", "score": 0.8}],
+    }[name]
+
+    results = await screen_names(["Test BV", "Test Trading", "Test BV", ""])
+
+    assert mock_search.call_count == 2
+    assert sorted((r["id"], r["score"]) for r in results) == [("a", 0.8), ("b", 0.9)]
+
+
+@pytest.mark.asyncio
+@patch("connectors.opensanctions_connector._retrying")
+@patch("connectors.opensanctions_connector._get_client")
+async def test_match_entities_timeout_raises(mock_get_client, mock_retrying):
+    """Test a timeout surfaces as an API error instead of an empty (clean) result."""
+    mock_retrying.return_value = AsyncRetrying(stop=stop_after_attempt(1), reraise=True)
+    mock_get_client.return_value.request = AsyncMock(side_effect=httpx.ReadTimeout("timeout"))
+
+    with pytest.raises(OpenSanctionsAPIError):
+        await match_entities([{"name": "Timeout Test"}])
@@ -0,0 +1,146 @@
+"""
+Tests for client-side rate limiting
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from connectors._ratelimit import AIMDController, SlidingWindowLimiter
+
+
+@pytest.mark.asyncio
+async def test_limiter_allows_up_to_rpm_immediately():
+    """Test requests within the quota are not delayed."""
+    limiter = SlidingWindowLimiter(rpm=3, window=60)
+    start = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire()
+    assert time.monotonic() - start < 0.05
+
+
+@pytest.mark.asyncio
+async def test_limiter_waits_for_window():
+    """Test a request over the quota waits for the window to slide."""
+    limiter = SlidingWindowLimiter(rpm=2, window=0.1)
+    start = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_limiter_fails_open_concurrently_when_redis_is_slow():
+    """Test a slow shared window neither serializes requests nor is retried during cooldown."""
+    calls = 0
+
+    async def slow_script(**kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(10)
+
+    redis = MagicMock()
+    redis.register_script.return_value = slow_script
+    limiter = SlidingWindowLimiter(rpm=100, window=60)
+
+    with (
+        patch("connectors._ratelimit.redis_client.get_redis", return_value=redis),
+        patch("connectors._ratelimit._SHARED_TIMEOUT", 0.05),
+    ):
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(10)))
+        assert time.monotonic() - start < 0.5
+
+        calls_before = calls
+        await limiter.acquire()
+        assert calls == calls_before
+
+
+def test_limiter_pauses_on_retry_after():
+    """Test Retry-After pauses the limiter."""
+    limiter = SlidingWindowLimiter(rpm=10)
+    limiter.update_from_headers({"Retry-After": "5"})
+    assert limiter._paused_until > time.monotonic() + 4
+
+
+def test_limiter_pauses_when_quota_nearly_spent():
+    """Test low remaining quota pauses until the reset."""
+    limiter = SlidingWindowLimiter(rpm=10)
+    limiter.update_from_headers({"X-RateLimit-Remaining": "50", "X-RateLimit-Limit": "100"})
+    assert limiter._paused_until == 0.0
+
+    headers = {"X-RateLimit-Remaining": "5", "X-RateLimit-Limit": "100", "X-RateLimit-Reset": "30"}
+    limiter.update_from_headers(headers)
+    assert limiter._paused_until > time.monotonic() + 29
+
+
+def test_limiter_reset_pause_is_bounded_by_window():
+    """Test an epoch or oversized X-RateLimit-Reset pauses for at most one window."""
+    limiter = SlidingWindowLimiter(rpm=10)
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Limit": "100"}
+
+    limiter.update_from_headers({**headers, "X-RateLimit-Reset": str(int(time.time()) + 20)})
+    assert time.monotonic() + 18 < limiter._paused_until <= time.monotonic() + 21
+
+    limiter.update_from_headers({**headers, "X-RateLimit-Reset": "86400"})
+    assert limiter._paused_until <= time.monotonic() + limiter.window
+
+
+def test_aimd_grows_on_fast_responses_and_halves_on_error():
+    """Test additive increase on low latency and multiplicative decrease on errors."""
+    controller = AIMDController(error_types=(TimeoutError,), initial=4, target_latency=0.5)
+    for _ in range(20):
+        controller.on_success(0.1)
+    assert controller.limit > 4
+
+    before = controller.limit
+    controller.on_error()
+    assert controller.limit <= before // 2 + 1
+
+
+@pytest.mark.asyncio
+async def test_aimd_slot_caps_concurrency():
+    """Test no more than the current limit of slots are held at once."""
+    controller = AIMDController(error_types=(TimeoutError,), initial=2, max_limit=2)
+    active = []
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with controller.slot():
+            active.append(1)
+            peak = max(peak, len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_aimd_slot_backs_off_on_error_types():
+    """Test listed errors reduce the limit and are re-raised."""
+    controller = AIMDController(error_types=(TimeoutError,), initial=8)
+    with pytest.raises(TimeoutError):
+        async with controller.slot():
+            raise TimeoutError()
+    assert controller.limit == 4
+
+
+def test_primitives_bind_to_the_running_loop():
+    """Test limiters built outside a loop work across separate event loops."""
+    limiter = SlidingWindowLimiter(rpm=100)
+    controller = AIMDController(error_types=(TimeoutError,), initial=1)
+
+    async def contend():
+        async def request():
+            await limiter.acquire()
+            async with controller.slot():
+                await asyncio.sleep(0.001)
+
+        await asyncio.gather(*(request() for _ in range(3)))
+
+    for _ in range(2):
+        asyncio.run(contend())